@@ -6,17 +6,30 @@ import traceback
 import platform
 import subprocess
 import threading
+import functools
+import mmap
 import io
 import base64
 import json
-import shlex
+import collections
 import socket
+import struct
+import urllib.parse
+import zlib
+import math
+import tempfile
+import hashlib
 
 # ==========================================
 # 🛑 ログ出力の強制設定
 # ==========================================
+# コンソールに出す場合は1行ずつ表示し、パイプやファイルに流す場合はまとめて書き出す
+# （まとめる場合は、処理の区切りごとに flush=True で確実に出力する）
 if sys.stdout and hasattr(sys.stdout, 'reconfigure'):
-    sys.stdout.reconfigure(line_buffering=True)
+    if sys.stdout.isatty():
+        sys.stdout.reconfigure(line_buffering=True)
+    else:
+        sys.stdout.reconfigure(line_buffering=False, write_through=False)
 if sys.stderr and hasattr(sys.stderr, 'reconfigure'):
     sys.stderr.reconfigure(line_buffering=True)
 
@@ -25,33 +38,98 @@ print("🚀 アプリケーションの初期化を開始します...")
 # ==========================================
 # 🛑 エラー時の待機関数
 # ==========================================
+_EXIT_BANNER = (
+    "\n" + "="*60 + "\n"
+    "⚠️  プログラムを終了します。\n"
+    "エンターキーを押すとウィンドウを閉じます...\n"
+    + "="*60 + "\n\n"
+)
+
 def wait_before_exit():
-    print("\n" + "="*60)
-    print("⚠️  プログラムを終了します。")
-    print("エンターキーを押すとウィンドウを閉じます...")
-    print("="*60 + "\n")
+    # 入力待ちできない環境（サービスやパイプ経由の起動など）では待たずに終了する
+    if not sys.stdin or not sys.stdin.isatty():
+        return
+    # メッセージはまとめて1回で書き出す
+    if sys.stdout:
+        sys.stdout.write(_EXIT_BANNER)
+        sys.stdout.flush()
     try:
         input()
-    except:
+    except (EOFError, KeyboardInterrupt):
         pass
 
 # ==========================================
 # 空いているポートを探す関数
 # ==========================================
+# ループ内で毎回 socket モジュールの属性を引かないよう、先に束縛しておく
+_socket = socket.socket
+_AF_INET = socket.AF_INET
+_AF_INET6 = socket.AF_INET6
+_SOCK_STREAM = socket.SOCK_STREAM
+
+# ブラウザ(Chromium)が接続を拒否するポート。ここを選ぶと画面が開けないので最初から飛ばす
+# ※ 1024 未満は管理者権限が必要なので、範囲ごと探索対象から外している
+_UNSAFE_PORTS = frozenset({
+    1719, 1720, 1723, 2049, 3659, 4045, 4190, 5060, 5061,
+    6000, 6566, 6665, 6666, 6667, 6668, 6669, 6679, 6697, 10080,
+})
+
+def open_probe_socket():
+    """
+    ポート確認用のソケットを作り、(ソケット, バインド先アドレス) を返す関数
+    IPv6 が使える環境では IPv4/IPv6 両対応（デュアルスタック）で確認し、
+    使えない環境では IPv4 だけで確認する
+    """
+    if socket.has_ipv6:
+        try:
+            # IPv6 が無効化されている環境では bind で初めて失敗するので、一度試しておく
+            with _socket(_AF_INET6, _SOCK_STREAM) as test_sock:
+                test_sock.bind(('::', 0))
+            sock = _socket(_AF_INET6, _SOCK_STREAM)
+            try:
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+                return sock, '::'
+            except (OSError, AttributeError):
+                # デュアルスタックにできない場合は IPv4 で確認する
+                sock.close()
+        except OSError:
+            pass
+    return _socket(_AF_INET, _SOCK_STREAM), '0.0.0.0'
+
 def find_available_port(start_port):
     """
     指定されたポートから順に、利用可能な（空いている）ポートを探して返す関数
+    start_port が 0 の場合は、OSに空きポートを1回で選ばせる
     """
-    port = start_port
-    while port < 65535:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+    sock, host = open_probe_socket()
+    try:
+        # 直前まで使われていた（TIME_WAIT の）ポートを「使用中」と誤判定しないようにする
+        # ※ Linux 以外では付けない。Windows は使用中のポートにも重ねてバインドでき、
+        #    Mac などの BSD 系は 127.0.0.1 で待ち受け中のポートでも 0.0.0.0 / :: にはバインドできてしまう
+        # ※ SO_REUSEPORT も同様に、待ち受け中のポートを「空き」と誤判定しうるので付けない
+        if sys.platform.startswith("linux"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        if start_port == 0:
+            sock.bind((host, 0))
+            return sock.getsockname()[1]
+
+        # bind に失敗したソケットは未バインドのまま残るので、
+        # ポートごとに作り直さず1つのソケットで順番に試す
+        bind = sock.bind
+        for port in range(max(start_port, 1024), 65535):
+            if port in _UNSAFE_PORTS:
+                continue
             try:
-                # 0.0.0.0 (すべてのインターフェース) でバインドできるか試す
-                sock.bind(('0.0.0.0', port))
-                return port  # 成功したらそのポート番号を返す
+                # すべてのインターフェース (0.0.0.0 / ::) でバインドできるか試す
+                bind((host, port))
+                # 成功したら、実際にバインドされたポート番号を返す
+                return sock.getsockname()[1]
             except OSError:
                 # 失敗したら（すでに使われていたら）、次の番号へ
-                port += 1
+                continue
+    finally:
+        sock.close()
     return start_port
 
 def get_pid_by_port(port):
@@ -78,11 +156,15 @@ def get_pid_by_port(port):
 # 📦 ライブラリ読み込み
 # ==========================================
 try:
-    print("📦 ライブラリを読み込んでいます...")
+    print("📦 ライブラリを読み込んでいます...", flush=True)
     import gradio as gr
     import requests
+    from requests.adapters import HTTPAdapter
     from PIL import Image, PngImagePlugin 
-    from deep_translator import GoogleTranslator
+    # deep_translator は翻訳時に初めて読み込む（起動を軽くするため）。入っているかどうかだけは起動時に確認する
+    import importlib.util
+    if importlib.util.find_spec("deep_translator") is None:
+        raise ImportError("No module named 'deep_translator'")
     print("✅ 全てのライブラリ読み込み完了")
 except ImportError as e:
     print(f"❌ エラー: 必要なライブラリが見つかりません。\n詳細: {e}")
@@ -94,6 +176,26 @@ except Exception as e:
     wait_before_exit()
     sys.exit(1)
 
+# ==========================================
+# ⚡ 高速化ライブラリ（任意：無くても動作します）
+# ==========================================
+try:
+    # SIMD 対応の base64 (大きな画像データのエンコード/デコードが速い)
+    import pybase64
+except ImportError:
+    pybase64 = None
+try:
+    # 高速な JSON ライブラリ (base64 画像を含む大きなレスポンスの解析が速い)
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    # OpenCV (SIMD 対応で画像の縮小が速い)
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
 # 全体をtryブロックで囲む
 try:
     print("⚙️ 設定を読み込んでいます...")
@@ -161,6 +263,8 @@ try:
                 json.dump(new_settings, f, indent=4, ensure_ascii=False)
             
             update_globals(new_settings)
+            # 接続先が変わった可能性があるので、前回の接続確認の結果は使わない
+            check_server_status.cache_clear()
             return "" 
         except Exception as e:
             return f"❌ 保存エラー: {e}"
@@ -176,7 +280,8 @@ try:
         )
 
     def refresh_settings_ui():
-        return (SD_HOST, SD_PORT, SD_WEBUI_PATH, SD_BOOT_ARGS, BASE_OUTPUT_DIR)
+        # 入力欄の値と、設定画面の表示を一度にまとめて返す
+        return (SD_HOST, SD_PORT, SD_WEBUI_PATH, SD_BOOT_ARGS, BASE_OUTPUT_DIR, gr.update(visible=True))
 
     def update_globals(settings):
         global SD_HOST, SD_PORT, SD_WEBUI_PATH, SD_BOOT_ARGS, CURRENT_SD_URL, BASE_OUTPUT_DIR
@@ -204,10 +309,13 @@ try:
 
     # 8000番から探し始め、空いていなければ 8001, 8002... と自動でずれます
     APP_PORT = find_available_port(8000)
-    print(f"ℹ️ アプリケーションのポートを {APP_PORT} に設定しました")
+    print(f"ℹ️ アプリケーションのポートを {APP_PORT} に設定しました", flush=True)
 
     TARGET_MODEL_CANDIDATES = ["waiIllustriousSDXL", "waiNSFWIllustrious"]
-    SYSTEM_LOGS = []
+    SYSTEM_LOGS = collections.deque(maxlen=100)  # 古いものから自動で捨てられる
+    LOG_REVISION = 0  # ログが追加されるたびに増える番号（変更検知用）
+    LOG_CONDITION = threading.Condition()  # ログが追加されたことを、待っている画面側へ知らせる
+    LOG_STREAM_KEEPALIVE = 15.0  # ログが増えなくても、この秒数ごとに接続が生きているか確認する
     IGNORED_LOGS = ["画像を保存しました"]
     API_TIMEOUT = 3000
     STARTING = False
@@ -219,55 +327,228 @@ try:
     EXPECTED_JOB_COUNT = 1   # 予定される工程数（ADありなら2など）
     LAST_BATCH_INDEX = -1    # 画像が切り替わったか判定用
     LAST_PROGRESS = 0.0      # 直前の進捗％（逆行防止用）
-    LAST_LOGS_TEXT = None
+    LOGS_TEXT_CACHE = (-1, "")  # (番号, 連結済みテキスト)
+    POLL_CACHE_REVISION = 0  # ポーリング以外の処理が画面を書き換えるたびに増える番号（全ページに送り直させる）
+
+    # 状態確認（ポーリング）の間隔。生成中は短く、何も起きていない間は徐々に長くする
+    POLL_INTERVAL_ACTIVE = 1.0
+    POLL_INTERVAL_IDLE = 3.0
+    POLL_INTERVAL_MAX = 10.0
     SD_SERVER_PROCESS = None  # 起動したサーバーのプロセス情報を保持
 
+    # SDサーバーとの通信は1つのセッションで接続を使い回す
+    # trust_env=False で環境変数のプロキシ設定を無視する（ローカル通信がプロキシに流れないように）
+    SD_SESSION = requests.Session()
+    SD_SESSION.trust_env = False
+    SD_SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+    SD_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+    # 翻訳（翻訳器は1つだけ作って使い回す。複数スレッドから同時に使わないようロックする）
+    TRANSLATOR = None
+    TRANSLATE_LOCK = threading.Lock()
+    PREFETCH_TIMER = None  # ヒント入力後の先読み翻訳用タイマー
+
+    # 「元画像と切替」で表示する比較用画像の置き場所（保存先フォルダは汚さない）
+    PREVIEW_DIR = os.path.join(tempfile.gettempdir(), "gumi_art_assist_preview")
+    PREVIEW_MAX_AGE = 24 * 60 * 60  # 起動時に、これより古い比較用画像を削除する（秒）
+
     # ==========================================
     # 🛠️ ユーティリティ関数
     # ==========================================
+    def ttl_cache(seconds):
+        """結果を指定した秒数だけ使い回すデコレータ。cache_clear() で即座に破棄できる"""
+        def decorator(func):
+            cache = {}
+
+            @functools.wraps(func)
+            def wrapper(*args):
+                now = time.monotonic()
+                hit = cache.get(args)
+                if hit is not None and now - hit[0] < seconds: return hit[1]
+                value = func(*args)
+                cache[args] = (now, value)
+                return value
+
+            wrapper.cache_clear = cache.clear
+            return wrapper
+        return decorator
+
     def add_log(message):
+        global LOG_REVISION
         timestamp = time.strftime("%H:%M:%S")
         entry = f"[{timestamp}] {message}"
-        print(entry)
+        print(entry, flush=True)
         is_ignored = any(x in message for x in IGNORED_LOGS)
         if DEV_MODE or not is_ignored:
-            SYSTEM_LOGS.append(entry)
-            if len(SYSTEM_LOGS) > 100: SYSTEM_LOGS.pop(0)
-
-    def get_logs_text(): return "\n".join(SYSTEM_LOGS)
+            with LOG_CONDITION:
+                SYSTEM_LOGS.append(entry)
+                LOG_REVISION += 1
+                LOG_CONDITION.notify_all()
+
+    def get_logs_text():
+        # ログが増えていなければ、前回連結したテキストをそのまま返す
+        global LOGS_TEXT_CACHE
+        revision = LOG_REVISION
+        if LOGS_TEXT_CACHE[0] != revision:
+            LOGS_TEXT_CACHE = (revision, "\n".join(SYSTEM_LOGS))
+        return LOGS_TEXT_CACHE[1]
+
+    def stream_logs():
+        """ログが追加されたときだけ画面へ送る（最初は全文、以降は増えた行だけをログ欄の末尾に足す）"""
+        with LOG_CONDITION:
+            revision = LOG_REVISION
+            logs_text = get_logs_text()
+        yield logs_text, gr.update()
+        while True:
+            with LOG_CONDITION:
+                LOG_CONDITION.wait_for(lambda: LOG_REVISION != revision, timeout=LOG_STREAM_KEEPALIVE)
+                added = min(LOG_REVISION - revision, len(SYSTEM_LOGS))
+                new_lines = list(SYSTEM_LOGS)[-added:] if added else []
+                revision = LOG_REVISION
+            if not new_lines:
+                # 何も変えずに返すことで、ページが閉じられていればここで終了させる
+                yield gr.update(), gr.update()
+                continue
+            # 同じ内容の行が続いても変更として扱われるよう、先頭に番号を付けて送る
+            yield gr.update(), f"{revision}\n" + "\n".join(new_lines)
+
+    def b64encode_str(data):
+        if pybase64 is not None: return pybase64.b64encode_as_string(data)
+        return base64.b64encode(data).decode('utf-8')
+
+    def b64decode(data):
+        if pybase64 is not None: return pybase64.b64decode(data, validate=False)
+        return base64.b64decode(data)
+
+    def json_loads(data):
+        if orjson is not None: return orjson.loads(data)
+        return json.loads(data)
+
+    def file_to_base64(path):
+        # ファイルを mmap で読み、中間の bytes を作らずにそのまま base64 にする
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0: return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm: return b64encode_str(mm)
 
     def image_to_base64(image_path):
-        with open(image_path, "rb") as img_file: return base64.b64encode(img_file.read()).decode('utf-8')
+        return file_to_base64(image_path)
 
     def base64_to_image(b64_string):
         if isinstance(b64_string, str) and ',' in b64_string: b64_payload = b64_string.split(',', 1)[1]
         else: b64_payload = b64_string
-        return Image.open(io.BytesIO(base64.b64decode(b64_payload)))
+        return Image.open(io.BytesIO(b64decode(b64_payload)))
+
+    def base64_to_png_bytes(b64_string):
+        if isinstance(b64_string, str) and ',' in b64_string: b64_payload = b64_string.split(',', 1)[1]
+        else: b64_payload = b64_string
+        return b64decode(b64_payload)
+
+    PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+    PNG_TEXT_CHUNKS = (b"tEXt", b"iTXt", b"zTXt")
+
+    def add_png_text(png_bytes, key, text):
+        """PNGを再エンコードせずに、テキスト情報のチャンクを IHDR の直後へ差し込む（同じキーの既存チャンクは置き換える）"""
+        key_bytes = key.encode("latin-1")
+        try:
+            chunk_type, data = b"tEXt", key_bytes + b"\0" + text.encode("latin-1")
+        except UnicodeEncodeError:
+            # 日本語などを含む場合は iTXt (UTF-8) にする（PIL の add_text と同じ扱い）
+            chunk_type, data = b"iTXt", key_bytes + b"\0\0\0\0\0" + text.encode("utf-8")
+        new_chunk = struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+        view = memoryview(png_bytes)
+        parts = [view[:8]]
+        pos = 8
+        while pos < len(png_bytes):
+            # チャンク構造: [長さ 4byte][種類 4byte][データ][CRC 4byte]
+            length = struct.unpack_from(">I", png_bytes, pos)[0]
+            end = pos + 12 + length
+            ctype = png_bytes[pos + 4:pos + 8]
+            is_same_key = ctype in PNG_TEXT_CHUNKS and bytes(view[pos + 8:end - 4]).split(b"\0", 1)[0] == key_bytes
+            if not is_same_key:
+                parts.append(view[pos:end])
+                if ctype == b"IHDR": parts.append(new_chunk)
+            pos = end
+        return b"".join(parts)
 
     def resize_for_sd(image_path, max_size=2048):
-        img = Image.open(image_path).convert("RGB")
+        # 同じ画像（パスと更新日時が同じ）で再実行した場合は、前回の変換結果を使い回す
+        return resize_for_sd_cached(image_path, os.stat(image_path).st_mtime_ns, max_size)
+
+    @functools.lru_cache(maxsize=4)
+    def resize_for_sd_cached(image_path, mtime_ns, max_size):
+        img = Image.open(image_path)
+        w, h = img.size
+        # すでに「RGBのPNG・上限サイズ以下・8の倍数」なら、デコード/再エンコードせずファイルをそのまま送る
+        if img.format == "PNG" and img.mode == "RGB" and max(w, h) <= max_size and w % 8 == 0 and h % 8 == 0:
+            img.close()
+            return file_to_base64(image_path), w, h
+        if max(w, h) > max_size:
+            # JPEGの場合は、デコードの段階で（必要なサイズを下回らない範囲で）縮小して読み込む
+            # ※ 縦横とも指定サイズ以上に収まる場合だけ縮小されるので、正方形ではなく縮小後の実サイズを渡す
+            draft_scale = max_size / max(w, h)
+            img.draft("RGB", (math.ceil(w * draft_scale), math.ceil(h * draft_scale)))
+        img = img.convert("RGB")
         w, h = img.size
         scale = 1.0
         if max(w, h) > max_size: scale = max_size / max(w, h)
         new_w, new_h = int(w * scale), int(h * scale)
         new_w, new_h = new_w - (new_w % 8), new_h - (new_h % 8)
-        if scale != 1.0 or (w % 8 != 0) or (h % 8 != 0):
-            img = img.resize((new_w, new_h), Image.LANCZOS)
+        if scale != 1.0:
+            if cv2 is not None:
+                # 縮小は面積平均法で行う（OpenCV の LANCZOS4 は縮小時にアンチエイリアスが効かないため）
+                img = Image.fromarray(cv2.resize(np.asarray(img), (new_w, new_h), interpolation=cv2.INTER_AREA))
+            else:
+                # reducing_gap: 大きく縮小する場合は、先に整数倍で粗く縮めてから LANCZOS をかける
+                img = img.resize((new_w, new_h), Image.LANCZOS, reducing_gap=3.0)
+        elif (w % 8 != 0) or (h % 8 != 0):
+            # 縮小不要で端数だけ合わない場合は、作り直さずに右端・下端を切り落とす
+            img = img.crop((0, 0, new_w, new_h))
         buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        b64_string = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        # SDに渡すだけの一時データなので、圧縮率より速度を優先する
+        img.save(buffered, format="PNG", compress_level=1)
+        b64_string = b64encode_str(buffered.getvalue())
         return b64_string, new_w, new_h
 
+    def open_rgb_image(image_path):
+        # 比較用の PNG を書き出すとき（と、その失敗時）にしか使わないので、デコード結果は保持しない
+        if not isinstance(image_path, str): return image_path.convert("RGB")
+        with Image.open(image_path) as img: return img.convert("RGB")
+
+    @functools.lru_cache(maxsize=512)
+    def translate_ja_to_en(jp_text):
+        # 同じヒント文は前回の翻訳結果を使い回す（失敗した場合は例外になるのでキャッシュされない）
+        global TRANSLATOR
+        with TRANSLATE_LOCK:
+            if TRANSLATOR is None:
+                from deep_translator import GoogleTranslator
+                TRANSLATOR = GoogleTranslator(source='ja', target='en')
+            return TRANSLATOR.translate(jp_text)
+
+    def prefetch_translation(jp_text):
+        """入力が止まって少し経ったら裏で翻訳しておき、実行時はキャッシュから即座に返せるようにする"""
+        global PREFETCH_TIMER
+        if PREFETCH_TIMER is not None: PREFETCH_TIMER.cancel()
+        if not jp_text: return
+
+        def _prefetch():
+            try: translate_ja_to_en(jp_text)
+            except Exception: pass
+
+        PREFETCH_TIMER = threading.Timer(1.0, _prefetch)
+        PREFETCH_TIMER.daemon = True
+        PREFETCH_TIMER.start()
+
     def translate_and_optimize_prompt(jp_text):
         quality_tags = "masterpiece, best quality"
         negative_tags = "bad quality, worst quality, worst detail"
         if not jp_text: return quality_tags, negative_tags
         try:
-            en_text = GoogleTranslator(source='ja', target='en').translate(jp_text)
+            en_text = translate_ja_to_en(jp_text)
             add_log(f"翻訳完了: {jp_text} -> {en_text}")
         except Exception as e:
             en_text = jp_text
-            add_log("翻訳失敗 (原文を使用)")
+            add_log(f"翻訳失敗 (原文を使用): {e}")
         return f"{en_text}, {quality_tags}", negative_tags
 
     def ensure_adetailer_models():
@@ -282,21 +563,69 @@ try:
             "ad_confidence": 0.3
         }
 
-    def save_generated_image(image, parameters=None):
+    def save_generated_image(png_bytes, parameters=None):
         try:
             today_str = time.strftime("%Y-%m-%d")
             save_path = os.path.join(BASE_OUTPUT_DIR, today_str)
             os.makedirs(save_path, exist_ok=True)
-            filename = f"gen_{int(time.time())}_{id(image)}.png"
+            is_png = png_bytes[:8] == PNG_SIGNATURE
+            # PNGはパラメータだけチャンクとして差し込む（再エンコードしない）
+            if is_png and parameters: png_bytes = add_png_text(png_bytes, "parameters", parameters)
+            # ファイル名に内容のハッシュを入れる（同じ秒に保存しても重ならず、同じ名前なら中身も同じ）
+            filename = f"gen_{int(time.time())}_{hashlib.blake2b(png_bytes, digest_size=8).hexdigest()}.png"
             full_path = os.path.join(save_path, filename)
-            pnginfo_data = PngImagePlugin.PngInfo()
-            if parameters: pnginfo_data.add_text("parameters", parameters)
-            image.save(full_path, pnginfo=pnginfo_data)
+            if is_png:
+                with open(full_path, "wb") as f: f.write(png_bytes)
+            else:
+                # PNG以外で返ってきた場合は、PILでPNGに変換して保存する
+                pnginfo_data = PngImagePlugin.PngInfo()
+                if parameters: pnginfo_data.add_text("parameters", parameters)
+                Image.open(io.BytesIO(png_bytes)).save(full_path, pnginfo=pnginfo_data)
             return full_path
         except Exception as e:
             add_log(f"保存エラー: {e}")
             return None
 
+    def save_b64_png_directly(b64_string, parameters=None):
+        """APIから返った base64 の画像を、PILで開かずにそのまま保存してパスを返す（失敗時は None）"""
+        try:
+            png_bytes = base64_to_png_bytes(b64_string)
+        except Exception as e:
+            add_log(f"保存エラー: {e}")
+            return None
+        return save_generated_image(png_bytes, parameters=parameters)
+
+    def save_preview_image(image_path):
+        """元画像を比較表示用の PNG として一度だけ書き出してパスを返す（失敗時は None）"""
+        try:
+            # 同じファイル（パスと更新日時が同じ）なら同じファイル名になるので、再実行した場合は書き出しを省略できる
+            key = f"{image_path}:{os.stat(image_path).st_mtime_ns}".encode("utf-8")
+            full_path = os.path.join(PREVIEW_DIR, f"orig_{hashlib.blake2b(key, digest_size=8).hexdigest()}.png")
+            if not os.path.exists(full_path):
+                os.makedirs(PREVIEW_DIR, exist_ok=True)
+                # 線画の見比べに使うので画質は落とさない（PNG）。表示用なので圧縮は軽めにする
+                open_rgb_image(image_path).save(full_path, format="PNG", compress_level=1)
+            return full_path
+        except Exception as e:
+            add_log(f"比較用画像の作成エラー: {e}")
+            return None
+
+    def cleanup_preview_dir():
+        """前回までに作った古い比較用画像を削除する（同時に起動している別のアプリの分は残す）"""
+        try:
+            entries = os.scandir(PREVIEW_DIR)
+        except OSError:
+            return
+        limit = time.time() - PREVIEW_MAX_AGE
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < limit: os.remove(entry.path)
+                except OSError:
+                    pass
+
+    cleanup_preview_dir()
+
     def open_output_folder():
         today_str = time.strftime("%Y-%m-%d")
         path = os.path.join(BASE_OUTPUT_DIR, today_str)
@@ -316,13 +645,25 @@ try:
     # ==========================================
     def try_connect(url):
         try:
-            r = requests.get(f"{url}/sdapi/v1/progress", timeout=3, proxies={"http": None, "https": None})
+            r = SD_SESSION.get(f"{url}/sdapi/v1/progress", timeout=3)
             return (True, "OK") if r.status_code == 200 else (False, f"Status {r.status_code}")
         except Exception as e: return False, str(e)
 
+    def tcp_alive(host_url, port, timeout=0.5):
+        """HTTPは使わず、サーバーのポートに接続できるかだけを確認する"""
+        host = urllib.parse.urlsplit(host_url).hostname or host_url
+        try:
+            with socket.create_connection((host, int(port)), timeout=timeout): return True
+        except (OSError, ValueError):
+            return False
+
+    # 画面表示・タイマー・ボタン操作から続けて呼ばれても、接続確認は1秒に1回で済ませる
+    @ttl_cache(1.0)
     def check_server_status():
         global CURRENT_SD_URL
         target_url = f"{SD_HOST}:{SD_PORT}"
+        # ポートが閉じていれば（停止中によくある状態）、HTTPリクエストまでは行わない
+        if not tcp_alive(SD_HOST, SD_PORT): return "🔴 停止中"
         success, msg = try_connect(target_url)
         if success:
             if CURRENT_SD_URL != target_url: CURRENT_SD_URL = target_url
@@ -332,18 +673,45 @@ try:
     def interrupt_generation():
         try:
             add_log("⚠️ 生成中止リクエストを送信...")
-            requests.post(f"{CURRENT_SD_URL}/sdapi/v1/interrupt", proxies={"http": None, "https": None})
+            SD_SESSION.post(f"{CURRENT_SD_URL}/sdapi/v1/interrupt")
             global CURRENT_TASK
             CURRENT_TASK = None 
             return "中止しました"
         except Exception as e:
             return f"中止エラー: {e}"
 
-    def poll_status():
-        global LAST_PROGRESS, LAST_LOGS_TEXT, CURRENT_TASK, CURRENT_BATCH_INDEX, TOTAL_BATCH_COUNT, EXPECTED_JOB_COUNT, LAST_BATCH_INDEX
+    # 実行ボタンのスタイル（毎回組み立てないよう、先に用意しておく）
+    # 中止ボタンの表示/非表示もここで切り替える（ボタンごとの更新を送らずに済む）
+    STYLE_PROGRESS_TMPL = "<style>#{btn} {{ background: linear-gradient(90deg, #6366f1 {v}%, #e0e7ff {v}%) !important; pointer-events: none !important; }} #{stop} {{ display: flex !important; }}</style>"
+    STYLE_IDLE = "<style>#btn_cleanup, #btn_face_fix { background: linear-gradient(to bottom, #4f46e5, #4338ca) !important; pointer-events: auto !important; }</style>"
+    POLL_OUTPUT_COUNT = 8
+
+    def new_poll_session():
+        """ページごとのポーリング状態（タイマーはページごとに動くので、前回送った内容もページごとに覚える）"""
+        return {
+            "key": None,        # 待機中に最後に送った状態（変化が無ければ更新を省略する）
+            "revision": -1,     # 最後に確認した POLL_CACHE_REVISION
+            "outputs": None,    # 最後に送った各項目の値（変わった項目だけ送るため）
+            "skipped": False,   # 直前のポーリングで画面の更新を省略したか
+            "interval": POLL_INTERVAL_IDLE,  # このページのタイマーの現在の間隔
+            "idle_streak": 0,   # 変化の無いポーリングが何回続いたか
+        }
+
+    def invalidate_poll_cache():
+        """ポーリング以外の処理がボタンなどを書き換えたときに呼び、次回のポーリングで全項目を送り直させる"""
+        global POLL_CACHE_REVISION
+        POLL_CACHE_REVISION += 1
+
+    def poll_status(session, force=False):
+        global LAST_PROGRESS, CURRENT_TASK, CURRENT_BATCH_INDEX, TOTAL_BATCH_COUNT, EXPECTED_JOB_COUNT, LAST_BATCH_INDEX
+        session["skipped"] = False
+
+        # 前回このページに送ったあとで画面が書き換えられていれば、全項目を送り直す
+        if session["revision"] != POLL_CACHE_REVISION:
+            session["revision"] = POLL_CACHE_REVISION
+            force = True
         
         status = check_server_status()
-        logs = get_logs_text()
         
         # 進捗計算用の変数
         current_percent = 0.0
@@ -352,7 +720,7 @@ try:
 
         try:
             if "起動中" in status:
-                r = requests.get(f"{CURRENT_SD_URL}/sdapi/v1/progress", timeout=1, proxies={"http": None, "https": None})
+                r = SD_SESSION.get(f"{CURRENT_SD_URL}/sdapi/v1/progress", timeout=1)
                 if r.status_code == 200:
                     data = r.json()
                     
@@ -412,12 +780,20 @@ try:
             pass
         
         val = 100 if (not is_generating and LAST_PROGRESS > 0) else int(LAST_PROGRESS)
+
+        # 待機中で、前回送った内容から何も変わっていなければ、画面の更新をまるごと省略する
+        if is_generating:
+            session["key"] = None
+        else:
+            poll_key = (status, STARTING, val, CURRENT_SD_URL)
+            if not force and poll_key == session["key"]:
+                session["skipped"] = True
+                return tuple(gr.update() for _ in range(POLL_OUTPUT_COUNT))
+            session["key"] = poll_key
         
         # UI更新
         btn_cleanup_update = gr.update(value="実行 ➡", interactive=True)
         btn_face_fix_update = gr.update(value="実行 ➡", interactive=True)
-        btn_stop_update = gr.update(visible=False)      
-        btn_stop_face_update = gr.update(visible=False) 
         style_out = ""
 
         if is_generating:
@@ -425,59 +801,95 @@ try:
                 label = f"✨ 生成中...{job_info}"
                 btn_cleanup_update = gr.update(value=label, interactive=False)
                 btn_face_fix_update = gr.update(interactive=False)
-                btn_stop_update = gr.update(visible=True)
-                btn_stop_face_update = gr.update(visible=False)
-                style_out = f"""<style>#btn_cleanup {{ background: linear-gradient(90deg, #6366f1 {val}%, #e0e7ff {val}%) !important; pointer-events: none !important; }}</style>"""
+                style_out = STYLE_PROGRESS_TMPL.format(btn="btn_cleanup", stop="btn_stop", v=val)
             
             elif CURRENT_TASK == 'face_fix':
                 label = f"✨ 生成中...{job_info}" 
                 btn_cleanup_update = gr.update(interactive=False)
                 btn_face_fix_update = gr.update(value=label, interactive=False)
-                btn_stop_update = gr.update(visible=False)
-                btn_stop_face_update = gr.update(visible=True)
-                style_out = f"""<style>#btn_face_fix {{ background: linear-gradient(90deg, #6366f1 {val}%, #e0e7ff {val}%) !important; pointer-events: none !important; }}</style>"""
+                style_out = STYLE_PROGRESS_TMPL.format(btn="btn_face_fix", stop="btn_stop_face", v=val)
         
         else:
-            style_out = """<style>#btn_cleanup, #btn_face_fix { background: linear-gradient(to bottom, #4f46e5, #4338ca) !important; pointer-events: auto !important; }</style>"""
+            style_out = STYLE_IDLE
 
         btn_server_update = gr.update(interactive=False, value="🚀 起動中...") if STARTING else (gr.update(interactive=False, value="✅ 起動済み") if "起動中" in status else gr.update(interactive=True, value="🚀 サーバー起動"))
 
         is_running = ("起動中" in status)
         btn_stop_server_update = gr.update(interactive=is_running)
         
-        logs_out = logs if LAST_LOGS_TEXT != logs else gr.update()
-        if logs_out != gr.update(): LAST_LOGS_TEXT = logs
+        # ログは stream_logs が追加のたびに送るので、ポーリングでは送らない
+        logs_out = gr.update()
 
-        return (
+        outputs = (
             status, CURRENT_SD_URL, logs_out, 
             btn_server_update, 
             btn_stop_server_update, 
-            btn_cleanup_update, btn_stop_update, 
-            btn_face_fix_update, btn_stop_face_update, 
+            btn_cleanup_update, 
+            btn_face_fix_update, 
             style_out
         )
 
+        # 前回送った値と同じ項目は送らない（ログはここでは送らないので比較しない）
+        previous = None if force else session["outputs"]
+        # gr.update の辞書は Gradio が送信時に書き換える（value を取り出す）ので、比較用には複製を残す
+        session["outputs"] = tuple(dict(out) if isinstance(out, dict) else out for out in outputs)
+        if previous is None: return outputs
+        return tuple(gr.update() if i != 2 and out == prev else out for i, (out, prev) in enumerate(zip(outputs, previous)))
+
+    def poll_page(session):
+        """ページを開いたとき・サーバー停止後などに、変化の有無に関係なく全項目を送る"""
+        return poll_status(session, force=True) + (session,)
+
+    def poll_tick(session):
+        """タイマーから呼ばれる定期更新。状況に合わせて次回までの間隔も調整する（間隔はページごと）"""
+        outputs = poll_status(session)
+
+        if CURRENT_TASK is not None or STARTING:
+            # 生成中・起動中は進捗が滑らかに見えるよう短い間隔にする（別のページから始めた場合も同じ）
+            session["idle_streak"] = 0
+            interval = POLL_INTERVAL_ACTIVE
+        elif session["skipped"]:
+            # 変化の無い状態が3回続くごとに間隔を倍にする（上限あり）
+            session["idle_streak"] += 1
+            interval = min(POLL_INTERVAL_MAX, POLL_INTERVAL_IDLE * 2 ** (session["idle_streak"] // 3))
+        else:
+            session["idle_streak"] = 0
+            interval = POLL_INTERVAL_IDLE
+
+        # 間隔が変わるときだけタイマーを更新する
+        timer_update = gr.update() if interval == session["interval"] else gr.update(value=interval)
+        session["interval"] = interval
+        return outputs + (timer_update, session)
+
+    def speed_up_polling(session):
+        """生成開始・サーバー起動の直後は、待機中の長い間隔を待たずにすぐ短い間隔へ戻す"""
+        session["idle_streak"] = 0
+        session["interval"] = POLL_INTERVAL_ACTIVE
+        return gr.update(value=POLL_INTERVAL_ACTIVE), session
+
     def start_sd_server():
         global STARTING, SD_SERVER_PROCESS
+        import shlex
+
+        # ここで返す値で画面が書き換わるので、次回のポーリングでは全項目を送り直す
+        invalidate_poll_cache()
         
-        # 画面の更新対象は全部で10個あります。
+        # 画面の更新対象は全部で8個あります。
         # 1. status_display
         # 2. sd_url_display
         # 3. logs_display
         # 4. btn_start_server
         # 5. btn_stop_server (← 今回増えたやつ)
         # 6. btn_cleanup
-        # 7. btn_stop_trigger
-        # 8. btn_face_fix
-        # 9. btn_stop_trigger_face
-        # 10. style_default
+        # 7. btn_face_fix
+        # 8. style_default（中止ボタンの表示もここで切り替える）
 
         # 何も変更しない場合のデフォルト値（gr.update()）
         no_update = gr.update()
 
         if not SD_WEBUI_PATH or not os.path.exists(SD_WEBUI_PATH):
             add_log(f"エラー: WebUIパス不明: {SD_WEBUI_PATH}")
-            # エラー時も必ず10個返す
+            # エラー時も必ず8個返す
             return (
                 "⚠️ パスエラー",              # 1
                 CURRENT_SD_URL,              # 2
@@ -486,19 +898,17 @@ try:
                 no_update, # 5
                 no_update, # 6
                 no_update, # 7
-                no_update, # 8
-                no_update, # 9
-                no_update  # 10
+                no_update  # 8
             )
 
         if STARTING or "起動中" in check_server_status():
-            # 処理中も10個返す
+            # 処理中も8個返す
             return (
                 "処理中", 
                 CURRENT_SD_URL, 
                 get_logs_text(), 
                 gr.update(), 
-                no_update, no_update, no_update, no_update, no_update, no_update
+                no_update, no_update, no_update, no_update
             )
 
         try:
@@ -540,7 +950,7 @@ try:
 
             threading.Thread(target=_wait_for_start, daemon=True).start()
             
-            # 正常起動開始時も必ず10個返す
+            # 正常起動開始時も必ず8個返す
             return (
                 "🚀 起動中...",              # 1. 状態
                 CURRENT_SD_URL,              # 2. URL
@@ -549,20 +959,18 @@ try:
                 gr.update(interactive=False),# 5. 停止ボタン（まだ起動完了してないので無効のまま）
                 no_update,                   # 6
                 no_update,                   # 7
-                no_update,                   # 8
-                no_update,                   # 9
-                no_update                    # 10
+                no_update                    # 8
             )
             
         except Exception as e:
             add_log(f"起動エラー: {e}")
-            # 例外発生時も必ず10個返す
+            # 例外発生時も必ず8個返す
             return (
                 f"エラー: {str(e)}", 
                 CURRENT_SD_URL, 
                 get_logs_text(), 
                 gr.update(interactive=True, value="🚀 サーバー起動"), 
-                no_update, no_update, no_update, no_update, no_update, no_update
+                no_update, no_update, no_update, no_update
             )
 
     # ==========================================
@@ -631,6 +1039,7 @@ try:
 
             SD_SERVER_PROCESS = None
             STARTING = False
+            check_server_status.cache_clear()
             add_log("✅ サーバーを停止しました")
             return "停止しました"
 
@@ -638,6 +1047,28 @@ try:
             add_log(f"❌ 停止エラー: {e}")
             return f"停止エラー: {e}"
 
+    def post_img2img(payload):
+        """img2img を別スレッドで送信して完了を待つ（待っている間も中止ボタンに反応できるように）。中止された場合は None を返す"""
+        if orjson is not None:
+            body = {"data": orjson.dumps(payload), "headers": {"Content-Type": "application/json"}}
+        else:
+            body = {"json": payload}
+        result = {}
+        done = threading.Event()
+
+        def _post():
+            try: result["response"] = SD_SESSION.post(f"{CURRENT_SD_URL}/sdapi/v1/img2img", timeout=API_TIMEOUT, **body)
+            except Exception as e: result["error"] = e
+            finally: done.set()
+
+        # 中止したあとも応答待ちのまま残ることがあるので、アプリの終了を妨げないようデーモンにする
+        threading.Thread(target=_post, daemon=True).start()
+        while not done.wait(0.1):
+            if CURRENT_TASK is None:
+                return None
+        if "error" in result: raise result["error"]
+        return result["response"]
+
     def set_model_if_needed():
         try:
             # === 関数内関数: モデルリストから候補を探す ===
@@ -652,7 +1083,7 @@ try:
             add_log("🔍 モデル一覧を取得して確認します...")
             
             # 1. サーバーにある全モデル一覧を取得
-            models_res = requests.get(f"{CURRENT_SD_URL}/sdapi/v1/sd-models", proxies={"http": None, "https": None})
+            models_res = SD_SESSION.get(f"{CURRENT_SD_URL}/sdapi/v1/sd-models")
             if models_res.status_code != 200:
                 raise gr.Error(f"APIエラー: モデル一覧取得失敗 (Status {models_res.status_code})")
             
@@ -663,9 +1094,9 @@ try:
             # 2. 見つからなければリフレッシュして再取得
             if not target_model_title:
                 add_log("⚠️ 優先モデルが見つかりません。リフレッシュして再取得します...")
-                requests.post(f"{CURRENT_SD_URL}/sdapi/v1/refresh-checkpoints", proxies={"http": None, "https": None})
+                SD_SESSION.post(f"{CURRENT_SD_URL}/sdapi/v1/refresh-checkpoints")
                 
-                models_res = requests.get(f"{CURRENT_SD_URL}/sdapi/v1/sd-models", proxies={"http": None, "https": None})
+                models_res = SD_SESSION.get(f"{CURRENT_SD_URL}/sdapi/v1/sd-models")
                 all_models = models_res.json()
                 
                 # リフレッシュ後も一応出す
@@ -683,7 +1114,7 @@ try:
                 raise gr.Error(err_msg)
 
             # 4. モデル変更判定
-            opt_res = requests.get(f"{CURRENT_SD_URL}/sdapi/v1/options", proxies={"http": None, "https": None})
+            opt_res = SD_SESSION.get(f"{CURRENT_SD_URL}/sdapi/v1/options")
             current_model_title = opt_res.json().get("sd_model_checkpoint", "")
 
             add_log(f"ℹ️ 現在のモデル: {current_model_title}")
@@ -695,7 +1126,7 @@ try:
             # 5. 切り替え
             add_log(f"モデルを切り替えます...")
             payload = {"sd_model_checkpoint": target_model_title}
-            requests.post(f"{CURRENT_SD_URL}/sdapi/v1/options", json=payload, proxies={"http": None, "https": None})
+            SD_SESSION.post(f"{CURRENT_SD_URL}/sdapi/v1/options", json=payload)
             
             time.sleep(1)
             add_log(f"✅ モデル変更完了")
@@ -706,65 +1137,66 @@ try:
             add_log(error_text)
             raise gr.Error(error_text)
 
-    def cleanup_sketch(image_path, hint_text, batch_count, denoise_label, ad_mode, seed):
+    def gallery_update(images):
+        return gr.update(value=images, columns=1, visible=True)
+
+    def run_img2img_batch(task_name, log_label, image_path, hint_text, batch_count, seed, denoising_strength, alwayson_scripts, expected_jobs):
+        """ラフ画チェック・顔チェック共通の生成処理（1枚ずつ生成して、その都度ギャラリーに反映する）"""
         global CURRENT_TASK, CURRENT_BATCH_INDEX, TOTAL_BATCH_COUNT, EXPECTED_JOB_COUNT, LAST_BATCH_INDEX, LAST_PROGRESS
 
-        if "停止中" in check_server_status(): raise gr.Error("SDサーバーをAPIモードで起動してください")
-        
         # 初期化
-        CURRENT_TASK = 'cleanup'
+        CURRENT_TASK = task_name
         TOTAL_BATCH_COUNT = int(batch_count)
         CURRENT_BATCH_INDEX = 0
         LAST_BATCH_INDEX = -1
         LAST_PROGRESS = 0.0
-        
-        # 予定工程数の設定
-        EXPECTED_JOB_COUNT = 1
-        if ad_mode == "顔のみ" or ad_mode == "手のみ":
-            EXPECTED_JOB_COUNT = 2
-        elif ad_mode == "顔と手":
-            EXPECTED_JOB_COUNT = 3
-            
+        EXPECTED_JOB_COUNT = expected_jobs
+
+        # 実行ボタンを準備中に変える（モデルの切り替えなどで待つ間も押せないようにする）
+        # ボタンの表示を変えるので、次回のポーリングでは必ず画面を更新させる
+        invalidate_poll_cache()
+        yield gr.update(), gr.update(), gr.update(), gr.update(), gr.update(value="⏳ 準備中...", interactive=False), gr.update()
+
         ensure_adetailer_models()
         set_model_if_needed()
         
         if image_path is None: 
             CURRENT_TASK = None
-            yield [], "", gr.update(), None, gr.update(interactive=True, value="実行 ➡")
+            yield [], "", gr.update(), None, gr.update(interactive=True, value="実行 ➡"), gallery_update([])
             return
         
-        add_log("ラフ画チェック 画像生成開始...")
+        add_log(f"{log_label} 画像生成開始...")
         prompt, neg_prompt = translate_and_optimize_prompt(hint_text)
-        
-        strength_map = {"弱": 0.3, "中": 0.4, "強": 0.5}
-        d_strength = strength_map.get(denoise_label, 0.4)
 
         start_time = time.time()
         
         try:
             init_img_b64, w, h = resize_for_sd(image_path, max_size=2048)
-            
-            alwayson_scripts = {}
-            ad_args = [True] 
-            
-            if ad_mode == "顔のみ":
-                ad_args.append(create_safe_ad_args("face_yolov8s.pt", d_strength))
-                ad_args.append({"ad_model": "None"})
-            elif ad_mode == "手のみ":
-                ad_args.append(create_safe_ad_args("hand_yolov8n.pt", d_strength))
-                ad_args.append({"ad_model": "None"})
-            elif ad_mode == "顔と手":
-                ad_args.append(create_safe_ad_args("face_yolov8s.pt", d_strength))
-                ad_args.append(create_safe_ad_args("hand_yolov8n.pt", d_strength))
-                
-            if len(ad_args) > 1: 
-                alwayson_scripts["ADetailer"] = {"args": ad_args}
 
             gen_images = []
             parameters_list = []
+            shown_count = 0  # ギャラリーに送り済みの枚数
             
-            if isinstance(image_path, str): orig_img = Image.open(image_path).convert("RGB")
-            else: orig_img = image_path.convert("RGB")
+            # 比較用の元画像はファイルにしておく（切替のたびにPNGへ変換させない）
+            orig_img = save_preview_image(image_path) or open_rgb_image(image_path)
+
+            # 毎回同じ内容なので、リクエストはループの外で1回だけ組み立てる（seedだけ差し替える）
+            payload = {
+                "init_images": [init_img_b64], 
+                "prompt": prompt, 
+                "negative_prompt": neg_prompt,
+                "denoising_strength": denoising_strength, 
+                "seed": -1,
+                "steps": 20, 
+                "width": w, 
+                "height": h,
+                "cfg_scale": 7, 
+                "sampler_name": "Euler a",
+                "scheduler": "Automatic", 
+                "batch_size": 1, 
+                "alwayson_scripts": alwayson_scripts
+            }
+            base_seed = int(seed)
 
             for i in range(int(batch_count)):
                 if CURRENT_TASK is None:
@@ -772,44 +1204,30 @@ try:
                     break
 
                 CURRENT_BATCH_INDEX = i
-                
+
                 # -1ならランダム(API任せ)、固定値なら枚数ごとに+1して絵が被らないようにする
-                req_seed = int(seed)
-                if req_seed != -1:
-                    req_seed = req_seed + i
-
-                payload = {
-                    "init_images": [init_img_b64], 
-                    "prompt": prompt, 
-                    "negative_prompt": neg_prompt,
-                    "denoising_strength": d_strength, 
-                    "seed": req_seed,
-                    "steps": 20, 
-                    "width": w, 
-                    "height": h,
-                    "cfg_scale": 7, 
-                    "sampler_name": "Euler a",
-                    "scheduler": "Automatic", 
-                    "batch_size": 1, 
-                    "alwayson_scripts": alwayson_scripts
-                }
-                
-                res = requests.post(f"{CURRENT_SD_URL}/sdapi/v1/img2img", json=payload, timeout=API_TIMEOUT, proxies={"http": None, "https": None})
+                payload["seed"] = base_seed if base_seed == -1 else base_seed + i
+
+                res = post_img2img(payload)
+                if res is None:
+                    add_log("⛔️ ユーザー操作により生成を中止しました")
+                    break
 
                 if res.status_code == 422 and "Script 'ADetailer' not found" in res.text:
                     raise gr.Error("❌ ADetailer が見つかりません。")
 
                 if res.status_code == 200:
-                    json_data = res.json()
+                    json_data = json_loads(res.content)
                     if 'images' in json_data:
                         for b64 in json_data['images']:
-                            img = base64_to_image(b64)
-                            info_txt = json.loads(json_data.get("info", "{}")).get("infotexts", [""])[0]
+                            info_txt = json_loads(json_data.get("info") or "{}").get("infotexts", [""])[0]
                             parameters_list.append(info_txt)
-                            saved_path = save_generated_image(img, parameters=info_txt)
-                            gen_images.append(saved_path if saved_path else img)
+                            saved_path = save_b64_png_directly(b64, parameters=info_txt)
+                            # 保存できなかった場合だけ、画像として読み込んで表示する
+                            gen_images.append(saved_path if saved_path else base64_to_image(b64))
                     
-                    yield gen_images, parameters_list, gr.update(visible=True), orig_img, gr.update(value=f"生成中... ({i+1}/{batch_count})", interactive=False)
+                    shown_count = len(gen_images)
+                    yield gen_images, parameters_list, gr.update(visible=True), orig_img, gr.update(value=f"生成中... ({i+1}/{batch_count})", interactive=False), gallery_update(gen_images)
                 
                 else: 
                     raise gr.Error(f"API Error: {res.status_code}")
@@ -817,131 +1235,79 @@ try:
             add_log(f"画像生成完了 ({time.time() - start_time:.1f}秒) - {len(gen_images)}枚")
 
             CURRENT_TASK = None
-            yield gen_images, parameters_list, gr.update(visible=True), orig_img, gr.update(interactive=True, value="実行 ➡")
+            # 途中で送った内容と同じなら、ギャラリーは送り直さない
+            gallery_out = gr.update() if shown_count == len(gen_images) and gen_images else gallery_update(gen_images)
+            yield gen_images, parameters_list, gr.update(visible=True), orig_img, gr.update(interactive=True, value="実行 ➡"), gallery_out
 
         except Exception as e:
             CURRENT_TASK = None
             add_log(f"処理中止または通信エラー: {e}")
-            yield [], [], gr.update(visible=False), None, gr.update(interactive=True, value="実行 ➡")
+            yield [], [], gr.update(visible=False), None, gr.update(interactive=True, value="実行 ➡"), gallery_update([])
 
-    def fix_face_only(image_path, hint_text, batch_count, denoise_label, seed):
-        global CURRENT_TASK, CURRENT_BATCH_INDEX, TOTAL_BATCH_COUNT, LAST_PROGRESS, LAST_BATCH_INDEX, EXPECTED_JOB_COUNT
-        
-        if "停止中" in check_server_status(): raise gr.Error("SDサーバーを起動してください")
-        
-        # 初期化
-        CURRENT_TASK = 'face_fix'
-        TOTAL_BATCH_COUNT = int(batch_count)
-        CURRENT_BATCH_INDEX = 0
-        LAST_BATCH_INDEX = -1
-        LAST_PROGRESS = 0.0
-        
-        EXPECTED_JOB_COUNT = 2
+    def cleanup_sketch(image_path, hint_text, batch_count, denoise_label, ad_mode, seed):
+        if "停止中" in check_server_status(): raise gr.Error("SDサーバーをAPIモードで起動してください")
 
-        ensure_adetailer_models()
-        set_model_if_needed()
-        
-        if image_path is None:
-            CURRENT_TASK = None
-            yield [], "", gr.update(), None, gr.update(interactive=True, value="実行 ➡")
-            return
-        
-        add_log("顔チェック 画像生成開始...")
-        prompt, neg_prompt = translate_and_optimize_prompt(hint_text)
-        
-        strength_map = {"弱": 0.3, "中": 0.5, "強": 0.7}
-        ad_strength = strength_map.get(denoise_label, 0.5)
-        
-        start_time = time.time()
+        strength_map = {"弱": 0.3, "中": 0.4, "強": 0.5}
+        d_strength = strength_map.get(denoise_label, 0.4)
+
+        alwayson_scripts = {}
+        ad_args = [True] 
         
-        try:
-            init_img_b64, w, h = resize_for_sd(image_path, max_size=2048)
-            
-            alwayson_scripts = {
-                "ADetailer": {
-                    "args": [
-                        True, 
-                        create_safe_ad_args("face_yolov8s.pt", ad_strength),
-                        {"ad_model": "None"} 
-                    ]
-                }
-            }
+        if ad_mode == "顔のみ":
+            ad_args.append(create_safe_ad_args("face_yolov8s.pt", d_strength))
+            ad_args.append({"ad_model": "None"})
+        elif ad_mode == "手のみ":
+            ad_args.append(create_safe_ad_args("hand_yolov8n.pt", d_strength))
+            ad_args.append({"ad_model": "None"})
+        elif ad_mode == "顔と手":
+            ad_args.append(create_safe_ad_args("face_yolov8s.pt", d_strength))
+            ad_args.append(create_safe_ad_args("hand_yolov8n.pt", d_strength))
             
-            gen_images = []
-            parameters_list = []
+        if len(ad_args) > 1: 
+            alwayson_scripts["ADetailer"] = {"args": ad_args}
 
-            if isinstance(image_path, str): orig_img = Image.open(image_path).convert("RGB")
-            else: orig_img = image_path.convert("RGB")
+        # 予定工程数の設定（ADetailer の対象が増えるほど工程が増える）
+        expected_jobs = {"顔のみ": 2, "手のみ": 2, "顔と手": 3}.get(ad_mode, 1)
 
-            for i in range(int(batch_count)):
-                if CURRENT_TASK is None:
-                    add_log("⛔️ ユーザー操作により生成を中止しました")
-                    break
-
-                CURRENT_BATCH_INDEX = i
+        yield from run_img2img_batch(
+            'cleanup', "ラフ画チェック", image_path, hint_text, batch_count, seed,
+            d_strength, alwayson_scripts, expected_jobs
+        )
 
-                # -1ならランダム(API任せ)、固定値なら枚数ごとに+1して絵が被らないようにする
-                req_seed = int(seed)
-                if req_seed != -1:
-                    req_seed = req_seed + i
-
-                payload = {
-                    "init_images": [init_img_b64], 
-                    "prompt": prompt, 
-                    "negative_prompt": neg_prompt,
-                    "denoising_strength": 0.0, 
-                    "seed": req_seed,
-                    "steps": 20,
-                    "width": w, 
-                    "height": h,
-                    "cfg_scale": 7, 
-                    "sampler_name": "Euler a",
-                    "scheduler": "Automatic", 
-                    "batch_size": 1, 
-                    "alwayson_scripts": alwayson_scripts
-                }
-                
-                res = requests.post(f"{CURRENT_SD_URL}/sdapi/v1/img2img", json=payload, timeout=API_TIMEOUT, proxies={"http": None, "https": None})
+    def fix_face_only(image_path, hint_text, batch_count, denoise_label, seed):
+        if "停止中" in check_server_status(): raise gr.Error("SDサーバーを起動してください")
 
-                if res.status_code == 422 and "Script 'ADetailer' not found" in res.text:
-                    raise gr.Error("❌ ADetailer が見つかりません。")
+        strength_map = {"弱": 0.3, "中": 0.5, "強": 0.7}
+        ad_strength = strength_map.get(denoise_label, 0.5)
 
-                if res.status_code == 200:
-                    json_data = res.json()
-                    if 'images' in json_data:
-                        for b64 in json_data['images']:
-                            img = base64_to_image(b64)
-                            info_txt = json.loads(json_data.get("info", "{}")).get("infotexts", [""])[0]
-                            parameters_list.append(info_txt)
-                            saved_path = save_generated_image(img, parameters=info_txt)
-                            if saved_path:
-                                gen_images.append(saved_path)
-                            else:
-                                gen_images.append(img)
-                    
-                    yield gen_images, parameters_list, gr.update(visible=True), orig_img, gr.update(value=f"生成中... ({i+1}/{batch_count})", interactive=False)
-                else: 
-                    raise gr.Error(f"API Error: {res.status_code}")
-                
-            add_log(f"画像生成完了 ({time.time() - start_time:.1f}秒) - {len(gen_images)}枚")
-            CURRENT_TASK = None
-            yield gen_images, parameters_list, gr.update(visible=True), orig_img, gr.update(interactive=True, value="実行 ➡")
+        # 元画像はそのまま（denoising 0.0）で、ADetailer で顔だけを描き直す
+        alwayson_scripts = {
+            "ADetailer": {
+                "args": [
+                    True, 
+                    create_safe_ad_args("face_yolov8s.pt", ad_strength),
+                    {"ad_model": "None"} 
+                ]
+            }
+        }
 
-        except Exception as e:
-            CURRENT_TASK = None
-            add_log(f"処理中止または通信エラー: {e}")
-            yield [], [], gr.update(visible=False), None, gr.update(interactive=True, value="実行 ➡")
+        yield from run_img2img_batch(
+            'face_fix', "顔チェック", image_path, hint_text, batch_count, seed,
+            0.0, alwayson_scripts, 2
+        )
 
 
     def toggle_view(mode, gen_images, orig_img):
         count = len(gen_images) if gen_images else 1
         cols = 1 
         
+        # ギャラリー・表示モード・切替ボタンの文言を1回の応答でまとめて返す
         if mode == "生成画":
-            imgs = [orig_img.copy() for _ in range(count)]
-            return gr.update(value=imgs, columns=cols), "元画像"
+            # 同じ画像を並べるだけなので、コピーせず同じものを渡す
+            imgs = [orig_img] * count
+            return gr.update(value=imgs, columns=cols), "元画像", "🎨 生成画を表示"
         else:
-            return gr.update(value=gen_images, columns=cols), "生成画"
+            return gr.update(value=gen_images, columns=cols), "生成画", "🔄 元画像と切替"
 
     # ギャラリーで選択された画像のインデックスを取得する関数
     def on_gallery_select(evt: gr.SelectData):
@@ -952,91 +1318,44 @@ try:
             return params_list[index]
         return "パラメータ情報がありません、または画像が選択されていません。"
 
-    # ==========================================
-    # UI状態のリセット関数
-    # ==========================================
-    def reset_ui_state():
-        global CURRENT_BATCH_INDEX, LAST_PROGRESS, LAST_BATCH_INDEX
-        # 前回の値を即座に消去する
-        CURRENT_BATCH_INDEX = 0
-        LAST_PROGRESS = 0.0
-        LAST_BATCH_INDEX = -1
-        # 実行ボタンを準備中に変える
-        return gr.update(value="⏳ 準備中...", interactive=False)
-
     # ==========================================
     # 🖥️ UI構築
     # ==========================================
-    custom_css = """
-    footer {display: none !important;}
-    .gradio-container {min-height: 0px !important;}
-    .control-panel { display: flex !important; flex-direction: column !important; justify-content: center !important; gap: 10px !important; }
-    #btn_cleanup, #btn_face_fix { height: 80px !important; font-size: 1.2em !important; background: linear-gradient(to bottom, #4f46e5, #4338ca) !important; color: white !important; border-radius: 12px !important; line-height: 1.2 !important; }
-    
-    #sd_server_frame { 
-        border: 1px solid #e2e8f0; border-radius: 12px; padding: 20px; 
-        background-color: #f8fafc; margin-bottom: 24px; position: relative !important;
-    }
-    #btn_settings {
-        position: absolute !important; top: 10px !important; right: 10px !important;
-        width: 36px !important; height: 36px !important; background: transparent !important;
-        border: none !important; font-size: 20px !important; color: #9ca3af !important; z-index: 10 !important;
-    }
-    #btn_settings:hover { color: #4b5563 !important; transform: rotate(45deg); background-color: #e5e7eb !important; border-radius: 50% !important; }
-    
-    .server-btn { height: 50px !important; font-weight: bold !important; border-radius: 8px !important; }
-    
-    /* === ギャラリー表示修正 === */
-    #output_image_wrapper { 
-        position: relative !important;
-        height: auto !important; 
-        min-height: 400px;
-    }
-    
-    #output_img button, #output_face_gallery button {
-        overflow: visible !important;
-    }
-    
-    #output_img img, #output_face_gallery img {
-        display: block !important;
-        object-fit: contain !important;
-        width: 100% !important;
-        height: auto !important;
-        max-height: 600px !important; 
-        background-color: #f3f4f6;
-    }
-    
-    #btn_stop, #btn_stop_face {
-        background-color: #ef4444 !important; color: white !important; border: none !important;
-    }
-    #btn_stop:hover, #btn_stop_face:hover { background-color: #dc2626 !important; }
-    
-    #info_btn, #info_btn_2 { 
-        position: absolute !important; 
-        bottom: 5px !important; 
-        right: 5px !important; 
-        z-index: 9999 !important; 
-        width: 32px !important; 
-        height: 32px !important; 
-        background: rgba(255, 255, 255, 0.9) !important; 
-        border-radius: 8px !important;
-        border: 1px solid #e5e7eb !important;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1) !important;
-    }
-        
-    .modal-container {
-        position: fixed; top: 0; left: 0; width: 100%; height: 100%;
-        background: rgba(0, 0, 0, 0.5); z-index: 10000;
-        display: flex; justify-content: center; align-items: center;
-        backdrop-filter: blur(2px);
+    # 画面のスタイルは assets/custom.css に分けてある（exe化した場合は同梱したものを読む）
+    resource_path = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    try:
+        with open(os.path.join(resource_path, "assets", "custom.css"), encoding="utf-8") as f: custom_css = f.read()
+    except OSError as e:
+        custom_css = ""
+        add_log(f"スタイルの読み込みエラー: {e}")
+
+    # 送られてきた追加分だけをログ欄の末尾に足す（ログ欄全体は書き換えない）
+    # 残す行数は SYSTEM_LOGS の上限と合わせる
+    append_logs_js = """
+    (delta) => {
+        const box = document.querySelector('#logs_display textarea');
+        if (!box || !delta) return;
+        const added = delta.slice(delta.indexOf('\\n') + 1);
+        const lines = (box.value ? box.value + '\\n' + added : added).split('\\n');
+        box.value = lines.slice(-%d).join('\\n');
+        box.scrollTop = box.scrollHeight;
     }
-    .modal-content {
-        background: white; padding: 25px; border-radius: 12px;
-        box-shadow: 0 10px 25px rgba(0, 0, 0, 0.2);
-        width: 500px; max-width: 90%; max-height: 80vh;
-        overflow-y: auto; display: flex; flex-direction: column; gap: 15px;
+    """ % SYSTEM_LOGS.maxlen
+
+    # ギャラリーの画像のデコードを描画と切り離す（生成枚数が多いときに画面が固まりにくくする）
+    # ※ loading="lazy" は src が付く前に追加された画像にしか効かないので、あくまで補助
+    lazy_gallery_js = """
+    () => {
+        const apply = () => document.querySelectorAll('.output-gallery img').forEach((img) => {
+            if (img.decoding !== 'async') { img.loading = 'lazy'; img.decoding = 'async'; }
+        });
+        apply();
+        // タブを切り替えるとギャラリーが作り直されるので、常に存在する親要素を見張る
+        const root = document.querySelector('.gradio-container') || document.body;
+        new MutationObserver((records) => {
+            if (records.some((r) => r.addedNodes.length)) apply();
+        }).observe(root, { childList: true, subtree: true });
     }
-    .settings-row { display: flex !important; flex-direction: row !important; align-items: center !important; gap: 8px !important; }
     """
 
     with gr.Blocks(title="gumi ArtAssist", css=custom_css, theme=gr.themes.Soft()) as demo:
@@ -1048,13 +1367,16 @@ try:
             with gr.Row():
                 with gr.Column(scale=2):
                     with gr.Row():
-                        status_display = gr.Textbox(label="状態", value=check_server_status(), interactive=False)
+                        # 起動時に接続確認を待たないよう、実際の状態はページを開いたときの更新で表示する
+                        status_display = gr.Textbox(label="状態", value="⏳ 確認中...", interactive=False)
                         sd_url_display = gr.Textbox(label="接続先", value=CURRENT_SD_URL, interactive=False)
                     with gr.Row():
                         btn_start_server = gr.Button("🚀 サーバー起動", variant="primary", elem_classes="server-btn")
                         btn_stop_server = gr.Button("🛑 サーバー停止", variant="stop", elem_classes="server-btn", interactive=False)
                 with gr.Column(scale=3):
-                    logs_display = gr.Textbox(label="ログ", value=get_logs_text(), lines=5, max_lines=5, interactive=False, autoscroll=True)
+                    logs_display = gr.Textbox(label="ログ", value=get_logs_text(), lines=5, max_lines=5, interactive=False, autoscroll=True, elem_id="logs_display")
+                    # ログの追加分の受け渡し用（画面には出さない）
+                    logs_delta = gr.Textbox(elem_id="logs_delta", container=False, interactive=False)
 
         with gr.Group(visible=False) as modal_server_stop:
             with gr.Group(elem_classes="modal-container"):
@@ -1130,32 +1452,30 @@ try:
                     
                     with gr.Column(scale=1, min_width=100, elem_classes="control-panel"):
                         btn_cleanup = gr.Button("実行 ➡", variant="primary", elem_id="btn_cleanup")
-                        btn_stop_trigger = gr.Button("■ 中止", variant="stop", elem_id="btn_stop", visible=False)
+                        btn_stop_trigger = gr.Button("■ 中止", variant="stop", elem_id="btn_stop", elem_classes="stop-btn")
                     
                     with gr.Column(scale=5, min_width=400):
-                        with gr.Group(elem_id="output_image_wrapper"):
-                            output_cleanup = gr.Gallery(label="AIからの提案", interactive=False, elem_id="output_img", columns=1, object_fit="contain", format="png", visible=True, preview=True)
-                            btn_info_1 = gr.Button("ℹ️", elem_id="info_btn", visible=False)
+                        with gr.Group(elem_classes="output-image-wrapper"):
+                            output_cleanup = gr.Gallery(label="AIからの提案", interactive=False, elem_id="output_img", elem_classes="output-gallery", columns=1, object_fit="contain", format="png", visible=True, preview=True)
+                            btn_info_1 = gr.Button("ℹ️", elem_id="info_btn", elem_classes="info-btn", visible=False)
                             
                         with gr.Row(elem_classes="footer-btn-row"):
                             btn_toggle_diff = gr.Button("🔄 元画像と切替", size="sm")
                             btn_open_folder = gr.Button("📂 保存先を開く", size="sm")
                 
-                gen_event = btn_cleanup.click(fn=reset_ui_state, inputs=None, outputs=btn_cleanup).then(
+                btn_cleanup.click(
                     fn=cleanup_sketch, 
                     inputs=[input_img, input_hint, slider_batch, radio_strength, radio_ad, input_seed],
-                    outputs=[state_gen_images, state_params_tab1, btn_info_1, state_original_image, btn_cleanup]
-                ).then(
-                    fn=lambda imgs: gr.update(value=imgs, columns=1, visible=True), 
-                    inputs=state_gen_images,
-                    outputs=output_cleanup
+                    outputs=[state_gen_images, state_params_tab1, btn_info_1, state_original_image, btn_cleanup, output_cleanup]
                 )
 
-                output_cleanup.select(fn=on_gallery_select, inputs=None, outputs=state_selected_index_1)
+                # 矢印キーで続けて選択した場合は、処理中の分が終わったあと最後の選択だけを反映する
+                output_cleanup.select(fn=on_gallery_select, inputs=None, outputs=state_selected_index_1, trigger_mode="always_last", show_progress="hidden")
+                input_hint.change(fn=prefetch_translation, inputs=input_hint, outputs=None, show_progress="hidden", queue=False)
                 
                 btn_stop_trigger.click(lambda: gr.update(visible=True), None, modal_stop_confirm)
                 
-                btn_toggle_diff.click(fn=toggle_view, inputs=[state_view_mode, state_gen_images, state_original_image], outputs=[output_cleanup, state_view_mode], show_progress="hidden").then(lambda mode: f"🎨 生成画を表示" if mode == "元画像" else "🔄 元画像と切替", state_view_mode, btn_toggle_diff)
+                btn_toggle_diff.click(fn=toggle_view, inputs=[state_view_mode, state_gen_images, state_original_image], outputs=[output_cleanup, state_view_mode, btn_toggle_diff], show_progress="hidden")
                 
                 btn_info_1.click(
                     fn=get_selected_param, 
@@ -1183,37 +1503,34 @@ try:
                     
                     with gr.Column(scale=1, min_width=100, elem_classes="control-panel"):
                         btn_face_fix = gr.Button("実行 ➡", variant="primary", elem_id="btn_face_fix")
-                        btn_stop_trigger_face = gr.Button("■ 中止", variant="stop", elem_id="btn_stop_face", visible=False)
+                        btn_stop_trigger_face = gr.Button("■ 中止", variant="stop", elem_id="btn_stop_face", elem_classes="stop-btn")
                     
                     with gr.Column(scale=5, min_width=400):                        
-                        with gr.Group(elem_id="output_image_wrapper"):
-                            output_face = gr.Gallery(label="AIからの提案", interactive=False, elem_id="output_face_gallery", columns=1, object_fit="contain", format="png", visible=True, preview=True)
-                            btn_info_face = gr.Button("ℹ️", elem_id="info_btn_2", visible=False)
+                        with gr.Group(elem_classes="output-image-wrapper"):
+                            output_face = gr.Gallery(label="AIからの提案", interactive=False, elem_id="output_face_gallery", elem_classes="output-gallery", columns=1, object_fit="contain", format="png", visible=True, preview=True)
+                            btn_info_face = gr.Button("ℹ️", elem_id="info_btn_2", elem_classes="info-btn", visible=False)
                             
                         with gr.Row(elem_classes="footer-btn-row"):
                             btn_toggle_diff_face = gr.Button("🔄 元画像と切替", size="sm")
                             btn_open_folder_face = gr.Button("📂 保存先を開く", size="sm")
 
-                btn_face_fix.click(fn=reset_ui_state, inputs=None, outputs=btn_face_fix).then(
+                btn_face_fix.click(
                     fn=fix_face_only,
                     inputs=[input_img_face, input_hint_face, slider_batch_face, radio_strength_face, input_seed],
-                    outputs=[state_gen_images, state_params_tab2, btn_info_face, state_original_image, btn_face_fix]
-                ).then(
-                    fn=lambda imgs: gr.update(value=imgs, columns=1, visible=True),
-                    inputs=state_gen_images,
-                    outputs=output_face
+                    outputs=[state_gen_images, state_params_tab2, btn_info_face, state_original_image, btn_face_fix, output_face]
                 )
 
-                output_face.select(fn=on_gallery_select, inputs=None, outputs=state_selected_index_2)
+                output_face.select(fn=on_gallery_select, inputs=None, outputs=state_selected_index_2, trigger_mode="always_last", show_progress="hidden")
+                input_hint_face.change(fn=prefetch_translation, inputs=input_hint_face, outputs=None, show_progress="hidden", queue=False)
 
                 btn_stop_trigger_face.click(lambda: gr.update(visible=True), None, modal_stop_confirm)
                 
                 btn_toggle_diff_face.click(
                     fn=toggle_view,
                     inputs=[state_view_mode, state_gen_images, state_original_image],
-                    outputs=[output_face, state_view_mode],
+                    outputs=[output_face, state_view_mode, btn_toggle_diff_face],
                     show_progress="hidden"
-                ).then(lambda mode: f"🎨 生成画を表示" if mode == "元画像" else "🔄 元画像と切替", state_view_mode, btn_toggle_diff_face)
+                )
 
                 btn_info_face.click(
                     fn=get_selected_param,
@@ -1227,26 +1544,37 @@ try:
         btn_stop_yes.click(fn=interrupt_generation, outputs=None).then(lambda: gr.update(visible=False), None, modal_stop_confirm)
         btn_stop_no.click(lambda: gr.update(visible=False), None, modal_stop_confirm)
         
-        btn_settings.click(fn=refresh_settings_ui, outputs=[input_sd_host, input_sd_port, input_webui_path, input_boot_args, input_output_dir]).then(lambda: gr.update(visible=True), None, modal_settings)
+        btn_settings.click(fn=refresh_settings_ui, outputs=[input_sd_host, input_sd_port, input_webui_path, input_boot_args, input_output_dir, modal_settings])
         btn_cancel_settings.click(lambda: gr.update(visible=False), None, modal_settings)
         btn_save_settings.click(fn=save_settings_to_file, inputs=[input_sd_host, input_sd_port, input_webui_path, input_boot_args, input_output_dir], outputs=[save_msg]).then(lambda: gr.update(visible=False), None, modal_settings)
         btn_reset_settings.click(fn=reset_settings_ui, outputs=[input_sd_host, input_sd_port, input_webui_path, input_boot_args, input_output_dir]).then(lambda: "", None, save_msg)
 
-        style_default = gr.HTML(visible=False)
-        timer = gr.Timer(3.0)
+        # 非表示のコンポーネントは描画されないことがあるので、表示したうえでCSSで隠す
+        style_default = gr.HTML(elem_id="style_default")
+        timer = gr.Timer(POLL_INTERVAL_IDLE)
+        poll_session = gr.State(new_poll_session())
 
         poll_outputs = [
             status_display, sd_url_display, logs_display, 
             btn_start_server, 
             btn_stop_server, # ← ここを btn_refresh から btn_stop_server に変更
-            btn_cleanup, btn_stop_trigger, 
-            btn_face_fix, btn_stop_trigger_face, 
-            style_default
+            btn_cleanup, 
+            btn_face_fix, 
+            style_default  # 中止ボタンの表示/非表示もこのスタイルで切り替える
         ]
         
-        timer.tick(fn=poll_status, outputs=poll_outputs)
-        demo.load(fn=poll_status, outputs=poll_outputs)
+        timer.tick(fn=poll_tick, inputs=poll_session, outputs=poll_outputs + [timer, poll_session])
+        # ページを開いたときは、変化の有無に関係なく全項目を送る
+        demo.load(fn=poll_page, inputs=poll_session, outputs=poll_outputs + [poll_session])
+        # ログはタイマーを待たず、追加されたときにすぐ表示する（ページごとに1つ、常に待機させておく）
+        demo.load(fn=stream_logs, inputs=None, outputs=[logs_display, logs_delta], show_progress="hidden", concurrency_limit=None)
+        logs_delta.change(fn=None, inputs=logs_delta, outputs=None, js=append_logs_js)
+        demo.load(fn=None, inputs=None, outputs=None, js=lazy_gallery_js)
         btn_start_server.click(fn=start_sd_server, outputs=poll_outputs)
+
+        # 生成・起動を始めたら、すぐにポーリング間隔を短くする
+        for btn in (btn_cleanup, btn_face_fix, btn_start_server):
+            btn.click(fn=speed_up_polling, inputs=poll_session, outputs=[timer, poll_session], queue=False)
         
         # 停止ボタンのイベント
         btn_stop_server.click(lambda: gr.update(visible=True), None, modal_server_stop)
@@ -1257,12 +1585,13 @@ try:
         ).then(
             lambda: gr.update(visible=False), None, modal_server_stop
         ).then(
-            fn=poll_status, 
-            outputs=poll_outputs
+            fn=poll_page, 
+            inputs=poll_session,
+            outputs=poll_outputs + [poll_session]
         )
 
     if __name__ == "__main__":
-        print("🚀 アプリを起動中...")
+        print("🚀 アプリを起動中...", flush=True)
         demo.launch(server_port=APP_PORT, inbrowser=True, server_name="127.0.0.1")
 
 except Exception as e: